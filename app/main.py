@@ -1,11 +1,27 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from app.utils.image_processor import ImageProcessor
+from fastapi import FastAPI, File, UploadFile, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.utils.image_processor import (
+    ImageValidationError,
+    MAX_IMAGE_SIZE,
+    build_image_info,
+    get_process_pool,
+    open_and_validate,
+    reencode_image,
+    reencode_options,
+    run_in_process_pool,
+    shutdown_process_pool
+)
+from app.utils.upload_limit import UploadSizeLimitMiddleware, TOO_LARGE_DETAIL
 from app.services.bedrock_service import BedrockService
+from app.services.analysis_batcher import AnalysisBatcher
+from app.utils.logging_config import setup_logging, shutdown_logging
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import orjson
 import os
-from io import BytesIO
+from functools import lru_cache
 from pathlib import Path
 
 # Load environment variables
@@ -15,20 +31,42 @@ load_dotenv(override=True)
 # print(f"DEBUG: AWS_REGION = {os.getenv('AWS_REGION')}")
 # print(f"DEBUG: BEDROCK_MODEL_ID = {os.getenv('BEDROCK_MODEL_ID')}")
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (console writes happen on a background listener thread)
+setup_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    # No-op on first startup; restarts logging after an earlier shutdown
+    setup_logging(logging.INFO)
+    analysis_batcher.start()
+    get_process_pool()
+    yield
+    await analysis_batcher.stop()
+    await asyncio.to_thread(shutdown_process_pool)
+    # Flush queued log records on shutdown
+    shutdown_logging()
+
+
 # Create FastAPI app instance
 app = FastAPI(
     title="Fashion Design Analysis API",
     description="Upload fashion images for AI-powered analysis using AWS Bedrock",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Reject oversized uploads before the body is buffered
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Chunk size for reading uploaded files
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Initialize services
-image_processor = ImageProcessor()
 bedrock_service = BedrockService()
+analysis_batcher = AnalysisBatcher(bedrock_service)
 
 
 @app.get("/")
@@ -41,7 +79,8 @@ async def root():
             "docs": "/docs",
             "health": "/health",
             "scraped_images": "/scraped-images",
-            "analyze": "/analyze (POST)"
+            "analyze": "/analyze (POST)",
+            "analyze_stream": "/analyze/stream (POST, NDJSON)"
         },
         "description": "Upload fashion images from scraped data for detailed AI analysis"
     }
@@ -72,14 +111,8 @@ async def list_scraped_images():
             "categories": {}
         }
     
-    categories = {}
-    for category_dir in images_dir.iterdir():
-        if category_dir.is_dir():
-            images = list(category_dir.glob("*.jpg")) + list(category_dir.glob("*.png"))
-            categories[category_dir.name] = {
-                "count": len(images),
-                "sample_files": [img.name for img in images[:5]]
-            }
+    # Directory scans are blocking syscalls; keep them off the event loop
+    categories = await asyncio.to_thread(_scan_scraped_images, images_dir)
     
     return {
         "total_images": sum(cat["count"] for cat in categories.values()),
@@ -88,20 +121,152 @@ async def list_scraped_images():
     }
 
 
+SCRAPED_IMAGE_SUFFIXES = (".jpg", ".png")
+
+
+def _scan_scraped_images(images_dir: Path) -> dict:
+    """Return the (cached) per-category image index for images_dir"""
+    return _index_scraped_images(str(images_dir), _category_mtimes(images_dir))
+
+
+def _category_mtimes(images_dir: Path) -> tuple:
+    """
+    Snapshot of category folders and their modification times.
+    
+    A directory's mtime changes whenever files are added or removed,
+    so this tuple is a cheap cache key for the image index.
+    """
+    with os.scandir(images_dir) as entries:
+        return tuple(sorted(
+            (entry.name, entry.stat().st_mtime_ns)
+            for entry in entries if entry.is_dir()
+        ))
+
+
+@lru_cache(maxsize=1)
+def _index_scraped_images(images_dir: str, category_mtimes: tuple) -> dict:
+    """
+    Count images per category with one os.scandir pass per folder.
+    
+    Cached until any category folder changes (see _category_mtimes).
+    """
+    categories = {}
+    for name, _ in category_mtimes:
+        with os.scandir(os.path.join(images_dir, name)) as entries:
+            images = [
+                entry.name for entry in entries
+                if entry.name.endswith(SCRAPED_IMAGE_SUFFIXES) and entry.is_file()
+            ]
+        categories[name] = {
+            "count": len(images),
+            "sample_files": images[:5]
+        }
+    return categories
 
 
 @app.post("/analyze")
-async def analyze_image(file: UploadFile = File(...)):
+async def analyze_image(response: Response, file: UploadFile = File(...)):
     """
     Upload and analyze a fashion item image using AI.
     
+    Identical images are served from an in-process cache; the X-Cache
+    response header reports "hit" or "miss".
+    
     Args:
+        response: Outgoing response (used to set headers)
         file: Image file (JPEG, PNG, etc.)
     
     Returns:
         JSON with image info and AI-generated fashion analysis
     """
-    logger.info(f"Received file: {file.filename}")
+    image_info = await _process_upload(file)
+    
+    # Analyze with AWS Bedrock
+    try:
+        # Get AI analysis (blocking boto3 call runs in a worker thread,
+        # batched with concurrent requests when BEDROCK_BATCH_SIZE > 1)
+        analysis, cache_hit = await analysis_batcher.analyze(image_info["jpeg_bytes"])
+        response.headers["X-Cache"] = "hit" if cache_hit else "miss"
+        
+        # Return complete response
+        return {
+            "status": "success",
+            "filename": file.filename,
+            "image_info": _public_image_info(image_info),
+            "analysis": analysis
+        }
+    
+    except Exception as e:
+        logger.error("Bedrock analysis error: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"AI analysis failed: {str(e)}"
+        )
+
+
+@app.post("/analyze/stream")
+async def analyze_image_stream(file: UploadFile = File(...)):
+    """
+    Upload and analyze a fashion item image, streaming the analysis as it is generated.
+    
+    The response is newline-delimited JSON: an "image_info" line, then
+    "delta" lines carrying analysis text as Claude produces it, and finally
+    a "done" line (or an "error" line if the analysis fails midway).
+    
+    Args:
+        file: Image file (JPEG, PNG, etc.)
+    
+    Returns:
+        Streaming NDJSON response
+    """
+    image_info = await _process_upload(file)
+    jpeg_bytes = image_info["jpeg_bytes"]
+    
+    cached = await asyncio.to_thread(bedrock_service.get_cached_analysis, jpeg_bytes)
+    
+    def ndjson_lines():
+        # Sync generator: Starlette iterates it in a worker thread, so the
+        # blocking Bedrock event stream never runs on the event loop
+        yield orjson.dumps({
+            "type": "image_info",
+            "filename": file.filename,
+            "image_info": _public_image_info(image_info)
+        }) + b"\n"
+        
+        try:
+            if cached is not None:
+                yield orjson.dumps({"type": "delta", "text": cached}) + b"\n"
+            else:
+                for text in bedrock_service.stream_fashion_item(jpeg_bytes):
+                    yield orjson.dumps({"type": "delta", "text": text}) + b"\n"
+        except Exception as e:
+            logger.error("Bedrock analysis error: %s", e)
+            yield orjson.dumps({"type": "error", "detail": f"AI analysis failed: {str(e)}"}) + b"\n"
+            return
+        
+        yield orjson.dumps({"type": "done"}) + b"\n"
+    
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Cache": "hit" if cached is not None else "miss"}
+    )
+
+
+async def _process_upload(file: UploadFile) -> dict:
+    """
+    Check, read and validate an uploaded image.
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        Processed image info
+        
+    Raises:
+        HTTPException: If the upload is missing, not an image, too large or invalid
+    """
+    logger.info("Received file: %s", file.filename)
     
     # Check if file was provided
     if not file:
@@ -114,51 +279,65 @@ async def analyze_image(file: UploadFile = File(...)):
             detail=f"File must be an image. Got: {file.content_type}"
         )
     
-    # Read the file
-    contents = await file.read()
+    # Read the file in chunks, stopping as soon as it exceeds the size limit
+    contents = await _read_upload(file, MAX_IMAGE_SIZE)
     
     # Check if file is empty
     if len(contents) == 0:
         raise HTTPException(status_code=400, detail="Empty file provided")
     
-    # Validate and process image with Pillow
-    try:
-        image_info = image_processor.validate_and_process(contents, file.filename)
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Image processing error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to process image")
+    # Validate from the header alone; Bedrock-ready JPEGs are forwarded as-is
+    image = open_and_validate(contents, file.filename)
+    options = reencode_options(image)
     
-    # Analyze with AWS Bedrock
-    try:
-        # Convert PIL image to bytes for Bedrock
-        img_byte_arr = BytesIO()
-        image_info["image"].save(img_byte_arr, format='JPEG')
-        img_byte_arr = img_byte_arr.getvalue()
+    if options is None:
+        jpeg_bytes = contents
+    else:
+        # Decode/re-encode with Pillow in a worker process; Pillow holds the
+        # GIL for much of the work, so threads would share one core
+        try:
+            jpeg_bytes = await run_in_process_pool(
+                reencode_image, contents, file.filename, *options
+            )
+        except ImageValidationError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            logger.error("Image processing error: %s", e)
+            raise HTTPException(status_code=500, detail="Failed to process image")
+    
+    return build_image_info(image, file.filename, len(contents), jpeg_bytes)
+
+
+def _public_image_info(image_info: dict) -> dict:
+    """Image details returned to clients"""
+    return {
+        "dimensions": {
+            "width": image_info["width"],
+            "height": image_info["height"]
+        },
+        "format": image_info["format"],
+        "mode": image_info["mode"],
+        "size_bytes": image_info["size_bytes"]
+    }
+
+
+async def _read_upload(file: UploadFile, max_size: int) -> bytes:
+    """
+    Read an uploaded file without buffering more than max_size bytes.
+    
+    Args:
+        file: Uploaded file
+        max_size: Maximum allowed size in bytes
         
-        # Get AI analysis
-        analysis = bedrock_service.analyze_fashion_item(img_byte_arr)
+    Returns:
+        File contents
         
-        # Return complete response
-        return {
-            "status": "success",
-            "filename": file.filename,
-            "image_info": {
-                "dimensions": {
-                    "width": image_info["width"],
-                    "height": image_info["height"]
-                },
-                "format": image_info["format"],
-                "mode": image_info["mode"],
-                "size_bytes": image_info["size_bytes"]
-            },
-            "analysis": analysis
-        }
-    
-    except Exception as e:
-        logger.error(f"Bedrock analysis error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"AI analysis failed: {str(e)}"
-        )
+    Raises:
+        HTTPException: 413 if the file is larger than max_size
+    """
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer.extend(chunk)
+        if len(buffer) > max_size:
+            raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+    return bytes(buffer)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+from typing import List, Optional, Set, Tuple
+
+from app.services.bedrock_service import BedrockService
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisBatcher:
+    """
+    Coalesce concurrent analysis requests into multi-image Bedrock calls.
+    
+    Requests are queued and picked up by a background task. When a request
+    arrives and others are already waiting, the task collects up to
+    max_batch of them (waiting at most max_wait_ms for stragglers) and sends
+    them as one multi-image call. A lone request is dispatched immediately,
+    so batching adds no latency when the server is idle.
+    """
+    
+    def __init__(
+        self,
+        bedrock_service: BedrockService,
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[int] = None
+     ):
+        """
+        Initialize batcher.
+        
+        Args:
+            bedrock_service: Service used to run the analyses
+            max_batch: Maximum images per Bedrock call (1 disables batching,
+                default from BEDROCK_BATCH_SIZE)
+            max_wait_ms: Maximum time to wait for more requests to join a
+                batch (default from BEDROCK_BATCH_WAIT_MS)
+        """
+        self.bedrock_service = bedrock_service
+        if max_batch is None:
+            max_batch = int(os.getenv("BEDROCK_BATCH_SIZE", "1"))
+        if max_wait_ms is None:
+            max_wait_ms = int(os.getenv("BEDROCK_BATCH_WAIT_MS", "50"))
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether requests are being batched"""
+        return self.max_batch > 1 and self._worker is not None
+    
+    def start(self) -> None:
+        """Start the background batching task (call from the running event loop)"""
+        if self.max_batch <= 1 or self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            "Analysis batching enabled (max %d images, %.0fms wait)",
+            self.max_batch, self.max_wait * 1000
+        )
+    
+    async def stop(self) -> None:
+        """Stop batching and wait for in-flight batches to finish"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        
+        # Fail anything still queued
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Server is shutting down"))
+    
+    async def analyze(self, image_bytes: bytes) -> Tuple[str, bool]:
+        """
+        Analyze an image, possibly as part of a batch.
+        
+        Args:
+            image_bytes: JPEG image data
+        
+        Returns:
+            Tuple of (analysis text, whether it was served from cache)
+        
+        Raises:
+            Exception: If Bedrock is not configured or analysis fails
+        """
+        if not self.enabled:
+            return await asyncio.to_thread(
+                self.bedrock_service.analyze_fashion_item_cached, image_bytes
+            )
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_bytes, future))
+        return await future
+    
+    async def _run(self) -> None:
+        """Collect queued requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            
+            # Only wait for more requests when they are already queuing up
+            if not self._queue.empty():
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[bytes, asyncio.Future]]) -> None:
+        """Run one batch in a worker thread and resolve its futures"""
+        images = [image_bytes for image_bytes, _ in batch]
+        
+        try:
+            results = await asyncio.to_thread(
+                self.bedrock_service.analyze_fashion_items_cached, images
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch[0][1], exception=e)
+                return
+            
+            # A failed or unparseable batch is retried image by image, so one
+            # bad image does not fail the whole group
+            logger.warning("Batched analysis failed, retrying individually: %s", e)
+            await asyncio.gather(*(self._dispatch([item]) for item in batch))
+            return
+        
+        for (_, future), result in zip(batch, results):
+            self._resolve(future, result=result)
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future, result=None, exception: Optional[Exception] = None) -> None:
+        """Set a future's outcome unless the waiting request already went away"""
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
@@ -1,46 +1,131 @@
 import boto3
-import json
+from botocore.config import Config
+from botocore.exceptions import ClientError
+import orjson
 import base64
+import hashlib
 import os
-from typing import Optional
+import threading
+from collections import OrderedDict
+import re
+from typing import Final, Hashable, Iterator, List, Optional, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# What every analysis should cover (shared by single and batched prompts)
+_ANALYSIS_POINTS: Final[str] = """1. Item Type: What type of clothing/accessory is this?
+2. Colors: What are the main colors?
+3. Patterns: Any patterns, prints, or textures?
+4. Style: What style category (casual, formal, sporty, etc.)?
+5. Material: What materials does it appear to be made from?
+6. Design Features: Notable design elements, cuts, or details?
+7. Occasion: What occasions would this be suitable for?
+8. Brand Indicators: Any visible brand elements or luxury indicators?"""
+
+# Prompt for fashion analysis, built once at import
+_FASHION_PROMPT: Final[str] = f"""Analyze this fashion item in detail. Provide:
+
+{_ANALYSIS_POINTS}
+
+Be specific and detailed in your analysis."""
+
+_BATCH_PROMPT_TEMPLATE: Final[str] = """You are given {count} fashion item images, labelled "Image 1" to "Image {count}".
+Analyze each one separately, starting each analysis with a heading line "### Image <number>".
+For every image provide:
+
+""" + _ANALYSIS_POINTS + """
+
+Be specific and detailed in each analysis."""
+
+# Fixed parts of the Claude 3 request payload
+_PAYLOAD_TEMPLATE: Final[dict] = {
+    "anthropic_version": "bedrock-2023-05-31",
+    "max_tokens": 1000
+}
+_PROMPT_BLOCK: Final[dict] = {"type": "text", "text": _FASHION_PROMPT}
+
+# Heading that separates per-image sections in a batched analysis
+_BATCH_HEADING = re.compile(r"^#+\s*Image\s+(\d+)\b.*$", re.MULTILINE)
+
+# Claude 3 output token limit (caps batched responses)
+_MAX_OUTPUT_TOKENS = 4096
+
+# ValidationException messages that mean the latency setting itself was rejected
+_LATENCY_ERROR = re.compile(r"latency|performance\s*config", re.IGNORECASE)
+
 
 class BedrockService:
     """Service for interacting with AWS Bedrock AI models"""
     
     def __init__(self):
-        """Initialize Bedrock service"""
+        """Initialize Bedrock service with a single, reusable client"""
+        self._client_lock = threading.Lock()
+        self._client = self._create_client()
+        
+        # In-process LRU of analyses keyed by image content hash
+        self._cache: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_size = int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+        
+        # Models that rejected latency-optimized inference; sent standard requests from then on
+        self._standard_latency_models: Set[str] = set()
         logger.info("Bedrock service initialized")
     
     @property
     def client(self):
-        """Create a fresh Bedrock client for each request (handles SSO token refresh)"""
-        # Read config fresh each time
+        """
+        Cached Bedrock client, shared across requests.
+        
+        Reusing one client keeps botocore's connection pool (and its TLS
+        sessions) alive between calls. SSO / profile credentials are
+        refreshable, so botocore renews them in place when they expire.
+        If the client could not be created yet, creation is retried.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+    
+    def _create_client(self):
+        """Create the Bedrock runtime client from environment configuration"""
         aws_region = os.getenv("AWS_REGION", "us-east-1")
         aws_access_key = os.getenv("AWS_ACCESS_KEY_ID")
         aws_secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
         
+        # Connection pool sized for concurrent /analyze requests, with TCP
+        # keep-alive so idle pooled connections survive between calls
+        client_config = Config(
+            max_pool_connections=64,
+            retries={
+                "total_max_attempts": int(os.getenv("AWS_MAX_ATTEMPTS", "5")),
+                "mode": "adaptive"
+            },
+            tcp_keepalive=True,
+            connect_timeout=3,
+            read_timeout=120
+        )
+        
         try:
             if aws_access_key and aws_secret_key:
                 return boto3.client(
                     service_name="bedrock-runtime",
                     region_name=aws_region,
                     aws_access_key_id=aws_access_key,
-                    aws_secret_access_key=aws_secret_key
+                    aws_secret_access_key=aws_secret_key,
+                    config=client_config
                 )
             else:
                 # Use default AWS credentials (SSO/aws configure)
-                # Create a new session to get fresh credentials
                 session = boto3.Session()
                 return session.client(
                     service_name="bedrock-runtime",
-                    region_name=aws_region
+                    region_name=aws_region,
+                    config=client_config
                 )
         except Exception as e:
-            logger.error(f"Failed to create Bedrock client: {str(e)}")
+            logger.error("Failed to create Bedrock client: %s", e)
             return None
     
     @property
@@ -51,6 +136,69 @@ class BedrockService:
             "anthropic.claude-3-sonnet-20240229-v1:0"
         )
     
+    @property
+    def latency_mode(self):
+        """Get Bedrock latency mode ('standard' or 'optimized') from environment"""
+        mode = os.getenv("BEDROCK_LATENCY", "standard").strip().lower()
+        return mode if mode in ("standard", "optimized") else "standard"
+    
+    def _invoke_model(self, body: bytes, stream: bool = False):
+        """
+        Invoke the Bedrock model, requesting latency-optimized inference if enabled.
+        
+        Latency-optimized inference is only available for some models and
+        requires a cross-region inference profile ID (e.g. "us.anthropic...").
+        If the model rejects the latency setting, retry once with standard
+        latency and keep using standard latency for that model.
+        
+        Args:
+            body: Serialized JSON request body
+            stream: Use invoke_model_with_response_stream instead of invoke_model
+            
+        Returns:
+            dict: Raw invoke_model (or invoke_model_with_response_stream) response
+        """
+        if stream:
+            invoke = self.client.invoke_model_with_response_stream
+        else:
+            invoke = self.client.invoke_model
+        
+        model_id = self.model_id
+        if self.latency_mode != "optimized" or model_id in self._standard_latency_models:
+            return invoke(modelId=model_id, body=body)
+        
+        try:
+            return invoke(
+                modelId=model_id,
+                body=body,
+                performanceConfigLatency="optimized"
+            )
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            # Other validation errors (oversized image, bad payload) would fail again
+            if error.get("Code") != "ValidationException" \
+                    or not _LATENCY_ERROR.search(error.get("Message", "")):
+                raise
+            logger.warning(
+                "Latency-optimized inference not supported for %s, "
+                "using standard latency from now on: %s",
+                model_id, e
+            )
+            self._standard_latency_models.add(model_id)
+            return invoke(modelId=model_id, body=body)
+    
+    def _build_payload(self, image_bytes: bytes) -> dict:
+        """Build the Claude 3 request payload for one image (only the image block varies)"""
+        return {
+            **_PAYLOAD_TEMPLATE,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [self._image_block(image_bytes), _PROMPT_BLOCK]
+                }
+            ]
+        }
+    
     def analyze_fashion_item(self, image_bytes: bytes) -> str:
         """
         Analyze a fashion item image using AWS Bedrock.
@@ -71,65 +219,264 @@ class BedrockService:
             )
         
         try:
-            # Encode image to base64
-            image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+            logger.info(
+                "Sending request to Bedrock model: %s (latency: %s)",
+                self.model_id, self.latency_mode
+            )
             
-            # Prepare the prompt for fashion analysis
-            prompt = """Analyze this fashion item in detail. Provide:
-
-                        1. Item Type: What type of clothing/accessory is this?
-                        2. Colors: What are the main colors?
-                        3. Patterns: Any patterns, prints, or textures?
-                        4. Style: What style category (casual, formal, sporty, etc.)?
-                        5. Material: What materials does it appear to be made from?
-                        6. Design Features: Notable design elements, cuts, or details?
-                        7. Occasion: What occasions would this be suitable for?
-                        8. Brand Indicators: Any visible brand elements or luxury indicators?
-
-                        Be specific and detailed in your analysis."""
+            # Invoke Bedrock model
+            response = self._invoke_model(orjson.dumps(self._build_payload(image_bytes)))
             
-            # Prepare request payload for Claude 3
-            payload = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": image_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ]
-            }
+            # Parse response and extract the text from Claude's response
+            caption = orjson.loads(response["body"].read())["content"][0]["text"]
             
-            logger.info(f"Sending request to Bedrock model: {self.model_id}")
+            logger.info("Successfully received analysis from Bedrock")
+            return caption
+        
+        except Exception as e:
+            logger.error("Bedrock API error: %s", e)
+            raise Exception(f"Failed to analyze image with Bedrock: {str(e)}")
+    
+    def stream_fashion_item(self, image_bytes: bytes) -> Iterator[str]:
+        """
+        Analyze a fashion item image, yielding the analysis as it is generated.
+        
+        The complete analysis is added to the cache once the stream finishes.
+        
+        Args:
+            image_bytes: Raw image data as bytes
             
-            # Invoke Bedrock model
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(payload)
-            )
+        Yields:
+            str: Chunks of the analysis text
             
-            # Parse response
-            response_body = json.loads(response["body"].read())
+        Raises:
+            Exception: If Bedrock is not configured or analysis fails
+        """
+        # Check if client is initialized
+        if not self.client:
+            raise Exception(
+                "AWS Bedrock not configured. Please set AWS credentials in .env file"
+            )
+        
+        parts = []
+        try:
+            logger.info(
+                "Sending streaming request to Bedrock model: %s (latency: %s)",
+                self.model_id, self.latency_mode
+            )
             
-            # Extract the text from Claude's response
-            caption = response_body["content"][0]["text"]
+            response = self._invoke_model(
+                orjson.dumps(self._build_payload(image_bytes)),
+                stream=True
+            )
             
-            logger.info("Successfully received analysis from Bedrock")
-            return caption
+            # Each event carries one JSON message; text arrives in content_block_delta
+            for event in response["body"]:
+                chunk = event.get("chunk")
+                if not chunk:
+                    continue
+                message = orjson.loads(chunk["bytes"])
+                if message.get("type") == "content_block_delta":
+                    text = message["delta"].get("text")
+                    if text:
+                        parts.append(text)
+                        yield text
         
         except Exception as e:
-            logger.error(f"Bedrock API error: {str(e)}")
+            logger.error("Bedrock streaming API error: %s", e)
             raise Exception(f"Failed to analyze image with Bedrock: {str(e)}")
+        
+        logger.info("Successfully streamed analysis from Bedrock")
+        self._store_cached(self._cache_key(image_bytes), "".join(parts))
+    
+    def analyze_fashion_items(self, images: List[bytes]) -> List[str]:
+        """
+        Analyze several fashion item images with one Bedrock call.
+        
+        All images are sent in a single multi-image message that shares one
+        prompt; the response is split back into one analysis per image.
+        
+        Args:
+            images: Raw image data for each item
+            
+        Returns:
+            List of analyses, in the same order as images
+            
+        Raises:
+            Exception: If Bedrock is not configured, the call fails, or the
+                response cannot be split into one analysis per image
+        """
+        if len(images) == 1:
+            return [self.analyze_fashion_item(images[0])]
+        
+        # Check if client is initialized
+        if not self.client:
+            raise Exception(
+                "AWS Bedrock not configured. Please set AWS credentials in .env file"
+            )
+        
+        try:
+            count = len(images)
+            
+            # Label each image so the model can refer to it
+            content = []
+            for number, image_bytes in enumerate(images, 1):
+                content.append({"type": "text", "text": f"Image {number}:"})
+                content.append(self._image_block(image_bytes))
+            
+            content.append({"type": "text", "text": _BATCH_PROMPT_TEMPLATE.format(count=count)})
+            
+            payload = {
+                **_PAYLOAD_TEMPLATE,
+                "max_tokens": min(_MAX_OUTPUT_TOKENS, _PAYLOAD_TEMPLATE["max_tokens"] * count),
+                "messages": [{"role": "user", "content": content}]
+            }
+            
+            logger.info(
+                "Sending batched request (%d images) to Bedrock model: %s",
+                count, self.model_id
+            )
+            
+            response = self._invoke_model(orjson.dumps(payload))
+            text = orjson.loads(response["body"].read())["content"][0]["text"]
+            captions = self._split_batch_analysis(text, count)
+            
+            logger.info("Successfully received batched analysis from Bedrock")
+            return captions
+        
+        except Exception as e:
+            logger.error("Bedrock batch API error: %s", e)
+            raise Exception(f"Failed to analyze images with Bedrock: {str(e)}")
+    
+    @staticmethod
+    def _image_block(image_bytes: bytes) -> dict:
+        """
+        Build a base64 JPEG content block for the Claude messages API.
+        
+        Encodes from a memoryview to ASCII, avoiding an extra copy of the input.
+        """
+        return {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": base64.b64encode(memoryview(image_bytes)).decode("ascii")
+            }
+        }
+    
+    @staticmethod
+    def _split_batch_analysis(text: str, count: int) -> List[str]:
+        """
+        Split a batched response into per-image analyses.
+        
+        Args:
+            text: Model output containing "### Image <n>" sections
+            count: Number of images in the batch
+            
+        Returns:
+            List of analyses ordered by image number
+            
+        Raises:
+            ValueError: If any image is missing from the response
+        """
+        # re.split with a capture group yields [preamble, n1, body1, n2, body2, ...]
+        parts = _BATCH_HEADING.split(text)
+        sections = {}
+        for number, body in zip(parts[1::2], parts[2::2]):
+            sections.setdefault(int(number), body.strip())
+        
+        captions = [sections.get(number) for number in range(1, count + 1)]
+        if not all(captions):
+            raise ValueError(f"Expected {count} image sections, got {len(sections)}")
+        return captions
+    
+    def analyze_fashion_items_cached(self, images: List[bytes]) -> List[Tuple[str, bool]]:
+        """
+        Analyze several images, serving cached ones and batching the rest.
+        
+        Args:
+            images: Raw image data for each item
+            
+        Returns:
+            List of (analysis text, served from cache) tuples, in input order
+            
+        Raises:
+            Exception: If Bedrock is not configured or analysis fails
+        """
+        keys = [self._cache_key(image_bytes) for image_bytes in images]
+        results: List[Optional[Tuple[str, bool]]] = [None] * len(images)
+        
+        misses = []
+        for index, key in enumerate(keys):
+            cached = self._get_cached(key)
+            if cached is not None:
+                results[index] = (cached, True)
+            else:
+                misses.append(index)
+        
+        if misses:
+            captions = self.analyze_fashion_items([images[index] for index in misses])
+            for index, caption in zip(misses, captions):
+                self._store_cached(keys[index], caption)
+                results[index] = (caption, False)
+        
+        return results
+    
+    def analyze_fashion_item_cached(self, image_bytes: bytes) -> Tuple[str, bool]:
+        """
+        Analyze a fashion item image, reusing earlier results for identical images.
+        
+        Args:
+            image_bytes: Raw image data as bytes
+            
+        Returns:
+            Tuple of (analysis text, whether it was served from cache)
+            
+        Raises:
+            Exception: If Bedrock is not configured or analysis fails
+        """
+        key = self._cache_key(image_bytes)
+        
+        cached = self._get_cached(key)
+        if cached is not None:
+            logger.info("Serving analysis from cache")
+            return cached, True
+        
+        caption = self.analyze_fashion_item(image_bytes)
+        self._store_cached(key, caption)
+        return caption, False
+    
+    def get_cached_analysis(self, image_bytes: bytes) -> Optional[str]:
+        """
+        Look up a previous analysis of an identical image.
+        
+        Args:
+            image_bytes: Raw image data as bytes
+            
+        Returns:
+            Cached analysis text or None
+        """
+        return self._get_cached(self._cache_key(image_bytes))
+    
+    def _cache_key(self, image_bytes: bytes) -> Hashable:
+        """Build cache key from model settings and image content hash"""
+        digest = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        return (self.model_id, self.latency_mode, digest)
+    
+    def _get_cached(self, key: Hashable) -> Optional[str]:
+        """Return cached analysis (marking it recently used) or None"""
+        with self._cache_lock:
+            caption = self._cache.get(key)
+            if caption is not None:
+                self._cache.move_to_end(key)
+            return caption
+    
+    def _store_cached(self, key: Hashable, caption: str) -> None:
+        """Store analysis, evicting the least recently used entries over the size cap"""
+        if self._cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = caption
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
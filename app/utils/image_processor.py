@@ -1,7 +1,14 @@
-from PIL import Image
+from PIL import Image, features
 from io import BytesIO
 from fastapi import HTTPException
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Tuple
+import asyncio
+import multiprocessing
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +16,274 @@ logger = logging.getLogger(__name__)
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_DIMENSION = 4096  # Max width or height
 MIN_DIMENSION = 50    # Min width or height
+BEDROCK_MAX_EDGE = 1568  # Claude vision downscales anything larger on the long edge
+
+# JPEG decode/encode is the hot path; it is several times slower without libjpeg-turbo
+if not features.check_feature("libjpeg_turbo"):
+    logger.warning(
+        "Pillow is not linked against libjpeg-turbo; JPEG processing will be slower. "
+        "Install the official Pillow wheels or pillow-simd built with libjpeg-turbo."
+    )
+
+
+class ImageValidationError(Exception):
+    """
+    Picklable validation failure raised from image worker processes.
+    
+    HTTPException cannot be unpickled, so reencode_image converts it to this
+    and the caller turns it back into an HTTP error.
+    """
+    
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def open_and_validate(image_data: bytes, filename: str) -> Image.Image:
+    """
+    Check size and dimensions of an image without decoding its pixels.
+    
+    Only the header is parsed, so this is cheap enough to run in the
+    request's own process.
+    
+    Args:
+        image_data: Raw image bytes
+        filename: Original filename
+        
+    Returns:
+        Opened (header-only) PIL image
+        
+    Raises:
+        HTTPException: If image is invalid
+    """
+    # Check file size
+    if len(image_data) > MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image too large. Max size: {MAX_IMAGE_SIZE / 1024 / 1024}MB"
+        )
+    
+    try:
+        # Open image; this only parses the header, pixel data is not decoded yet
+        image = Image.open(BytesIO(image_data))
+        
+    except Exception as e:
+        logger.error("Failed to open image %s: %s", filename, e)
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid image file. File may be corrupted."
+        )
+    
+    width, height = image.size
+    
+    # Validate dimensions
+    if width > MAX_DIMENSION or height > MAX_DIMENSION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image dimensions too large. Max: {MAX_DIMENSION}x{MAX_DIMENSION}px"
+        )
+    
+    if width < MIN_DIMENSION or height < MIN_DIMENSION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image dimensions too small. Min: {MIN_DIMENSION}x{MIN_DIMENSION}px"
+        )
+    
+    return image
+
+
+def reencode_options(image: Image.Image) -> Optional[Tuple[bool, bool]]:
+    """
+    Decide whether an image must be re-encoded before it is sent to Bedrock.
+    
+    Args:
+        image: Opened (header-only) PIL image
+        
+    Returns:
+        None if the original bytes can be forwarded as-is, otherwise a
+        (convert, resize) tuple for reencode_image
+    """
+    needs_convert = image.mode not in ("RGB", "L")  # L is grayscale
+    needs_resize = max(image.size) > BEDROCK_MAX_EDGE
+    
+    if image.format == "JPEG" and not needs_convert and not needs_resize:
+        return None
+    return needs_convert, needs_resize
+
+
+def reencode_image(image_data: bytes, filename: str, convert: bool, resize: bool) -> bytes:
+    """
+    Process-pool entry point: decode, normalize and re-encode an image as JPEG.
+    
+    Args:
+        image_data: Raw image bytes (already validated)
+        filename: Original filename
+        convert: Convert to RGB
+        resize: Downscale to BEDROCK_MAX_EDGE on the long edge
+        
+    Returns:
+        JPEG-encoded bytes
+        
+    Raises:
+        ImageValidationError: If pixel data is corrupted
+    """
+    try:
+        image = Image.open(BytesIO(image_data))
+        return ImageProcessor._decode_and_encode(image, filename, convert, resize)
+    except HTTPException as e:
+        raise ImageValidationError(e.status_code, e.detail)
+
+
+def build_image_info(image: Image.Image, filename: str, size_bytes: int, jpeg_bytes: bytes) -> dict:
+    """
+    Build the processed-image result.
+    
+    Args:
+        image: Opened (header-only) PIL image
+        filename: Original filename
+        size_bytes: Size of the uploaded image
+        jpeg_bytes: JPEG bytes to send to Bedrock
+        
+    Returns:
+        dict with image info and processed data
+    """
+    width, height = image.size
+    format_name = image.format
+    mode = image.mode if image.mode in ("RGB", "L") else "RGB"
+    
+    logger.info(
+        "Processed image: %s - %dx%d %s %s", filename, width, height, format_name, mode
+    )
+    
+    return {
+        "width": width,
+        "height": height,
+        "format": format_name,
+        "mode": mode,
+        "size_bytes": size_bytes,
+        "jpeg_bytes": jpeg_bytes  # JPEG bytes to send to Bedrock
+    }
+
+
+def validate_and_process(image_data: bytes, filename: str) -> dict:
+    """
+    Validate image and return processed information, all in the calling process.
+    
+    Args:
+        image_data: Raw image bytes
+        filename: Original filename
+        
+    Returns:
+        dict with image info and processed data
+        
+    Raises:
+        HTTPException: If image is invalid
+    """
+    image = open_and_validate(image_data, filename)
+    options = reencode_options(image)
+    
+    if options is None:
+        # Already Bedrock-ready: forward the original bytes without decoding
+        jpeg_bytes = image_data
+    else:
+        jpeg_bytes = ImageProcessor._decode_and_encode(image, filename, *options)
+    
+    return build_image_info(image, filename, len(image_data), jpeg_bytes)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    """Give worker processes their own console logging"""
+    logging.basicConfig(level=logging.INFO, format=logging.BASIC_FORMAT)
+
+
+def _default_pool_size() -> int:
+    """
+    Pool size when IMAGE_PROCESS_WORKERS is unset.
+    
+    Under Gunicorn every server worker has its own pool, so the CPUs are
+    split between them (WEB_CONCURRENCY, exported by gunicorn_conf.py).
+    
+    Returns:
+        Number of worker processes
+    """
+    cpus = os.cpu_count() or 1
+    server_workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    return max(1, cpus // max(1, server_workers))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared process pool for image processing, creating it on first use.
+    
+    Pillow holds the GIL for much of decoding, mode conversion and encoding,
+    so a process pool lets concurrent uploads use more than one core.
+    Workers are spawned rather than forked so they do not inherit the
+    server's threads and logging queue. Size is IMAGE_PROCESS_WORKERS
+    (default: CPU count divided by WEB_CONCURRENCY).
+    
+    Returns:
+        ProcessPoolExecutor
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = int(os.getenv("IMAGE_PROCESS_WORKERS", "0")) or _default_pool_size()
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                logger.info("Image process pool started (%d workers)", workers)
+    return _pool
+
+
+def _discard_broken_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_process_pool() starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_process_pool(func: Callable, *args):
+    """
+    Run a function in the image process pool.
+    
+    A worker dying (e.g. OOM-killed mid-decode) breaks the whole pool; it
+    is then replaced and the call retried once, so one bad upload does not
+    take image processing down until restart.
+    
+    Args:
+        func: Picklable top-level function
+        *args: Arguments for func
+        
+    Returns:
+        func's result
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        logger.warning("Image process pool broke, restarting it")
+        _discard_broken_pool(pool)
+        return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the image process pool if it was started"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
 
 
 class ImageProcessor:
@@ -17,7 +292,7 @@ class ImageProcessor:
     @staticmethod
     def validate_and_process(image_data: bytes, filename: str) -> dict:
         """
-        Validate image and return processed information.
+        Validate image and return processed information (in the calling process).
         
         Args:
             image_data: Raw image bytes
@@ -29,60 +304,74 @@ class ImageProcessor:
         Raises:
             HTTPException: If image is invalid
         """
-        # Check file size
-        if len(image_data) > MAX_IMAGE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Image too large. Max size: {MAX_IMAGE_SIZE / 1024 / 1024}MB"
-            )
+        return validate_and_process(image_data, filename)
+    
+    @staticmethod
+    def _decode_and_encode(
+        image: Image.Image,
+        filename: str,
+        convert: bool,
+        resize: bool
+     ) -> bytes:
+        """
+        Decode image pixels, normalize them for Bedrock and encode as JPEG.
         
-        try:
-            # Try to open image
-            image = Image.open(BytesIO(image_data))
+        Args:
+            image: Opened (header-only) PIL image
+            filename: Original filename (for logging)
+            convert: Convert to RGB
+            resize: Downscale to BEDROCK_MAX_EDGE on the long edge
             
-            # Verify it's actually an image
-            image.verify()
+        Returns:
+            JPEG-encoded bytes
+            
+        Raises:
+            HTTPException: If pixel data is corrupted
+        """
+        try:
+            # Let JPEG decode straight at a reduced scale (no-op for other formats)
+            if resize:
+                image.draft("RGB", (BEDROCK_MAX_EDGE, BEDROCK_MAX_EDGE))
             
-            # Re-open after verify (verify closes the file)
-            image = Image.open(BytesIO(image_data))
+            image.load()
             
         except Exception as e:
-            logger.error(f"Failed to open image {filename}: {str(e)}")
+            logger.error("Failed to decode image %s: %s", filename, e)
             raise HTTPException(
                 status_code=400,
                 detail="Invalid image file. File may be corrupted."
             )
         
-        # Get image info
-        width, height = image.size
-        format_name = image.format
-        mode = image.mode
+        # Convert to RGB if needed (for consistency)
+        if convert:
+            image = image.convert("RGB")
         
-        # Validate dimensions
-        if width > MAX_DIMENSION or height > MAX_DIMENSION:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Image dimensions too large. Max: {MAX_DIMENSION}x{MAX_DIMENSION}px"
-            )
+        # Downscale to the largest size the model actually uses
+        if resize:
+            image.thumbnail((BEDROCK_MAX_EDGE, BEDROCK_MAX_EDGE), Image.Resampling.LANCZOS)
         
-        if width < MIN_DIMENSION or height < MIN_DIMENSION:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Image dimensions too small. Min: {MIN_DIMENSION}x{MIN_DIMENSION}px"
-            )
+        return ImageProcessor._encode_jpeg(image)
+    
+    @staticmethod
+    def _encode_jpeg(image: Image.Image) -> bytes:
+        """
+        Encode a PIL image as JPEG for Bedrock.
         
-        # Convert to RGB if needed (for consistency)
-        if mode not in ("RGB", "L"):  # L is grayscale
-            image = image.convert("RGB")
-            mode = "RGB"
-        
-        logger.info(f"Processed image: {filename} - {width}x{height} {format_name} {mode}")
-        
-        return {
-            "width": width,
-            "height": height,
-            "format": format_name,
-            "mode": mode,
-            "size_bytes": len(image_data),
-            "image": image  # PIL Image object for further processing
-        }
+        Args:
+            image: PIL image in RGB or L mode
+            
+        Returns:
+            JPEG-encoded bytes
+        """
+        output = BytesIO()
+        # Explicit, cheap-to-encode settings: 4:2:0 chroma subsampling,
+        # no extra Huffman optimization or progressive scans
+        image.save(
+            output,
+            format="JPEG",
+            quality=85,
+            subsampling=2,
+            optimize=False,
+            progressive=False
+        )
+        return output.getvalue()
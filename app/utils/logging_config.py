@@ -0,0 +1,62 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+_stream_handler: Optional[logging.Handler] = None
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """
+    Configure root logging so log output is written by a background thread.
+    
+    Request handlers only put records on an in-memory queue; a QueueListener
+    thread performs the blocking console writes, keeping them off the
+    event loop. Safe to call again, e.g. on each application startup; it
+    does nothing while the listener is already running.
+    
+    Args:
+        level: Root log level
+    """
+    global _stream_handler, _queue_handler, _listener
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+    
+    if _stream_handler is None:
+        _stream_handler = logging.StreamHandler()
+        _stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    # Attached directly after an earlier shutdown_logging()
+    root.removeHandler(_stream_handler)
+    
+    log_queue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    
+    _listener = QueueListener(log_queue, _stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued log records and stop the listener thread.
+    
+    Later records are written to the console directly until setup_logging()
+    is called again. Does nothing if logging is not running.
+    """
+    global _queue_handler, _listener
+    
+    if _listener is None:
+        return
+    
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    root.addHandler(_stream_handler)
+    
+    _queue_handler = None
+    _listener = None
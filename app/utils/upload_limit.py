@@ -0,0 +1,57 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.utils.image_processor import MAX_IMAGE_SIZE
+
+# Allowed request body size: the image itself plus multipart boundaries/headers
+MAX_UPLOAD_SIZE = MAX_IMAGE_SIZE + 64 * 1024
+
+TOO_LARGE_DETAIL = f"Image too large. Max size: {MAX_IMAGE_SIZE / 1024 / 1024}MB"
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized upload bodies before they are buffered.
+    
+    The Content-Length header is checked up front; bodies without one
+    (chunked transfer) are counted as they stream in and aborted as soon
+    as they exceed the limit.
+    """
+    
+    def __init__(self, app, max_body_size: int = MAX_UPLOAD_SIZE, paths: tuple = ("/analyze", "/analyze/stream")):
+        """
+        Args:
+            app: Wrapped ASGI application
+            max_body_size: Maximum request body size in bytes
+            paths: Request paths the limit applies to
+        """
+        self.app = app
+        self.max_body_size = max_body_size
+        self.paths = paths
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        
+        # Reject immediately based on the declared size
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > self.max_body_size:
+            response = JSONResponse(status_code=413, content={"detail": TOO_LARGE_DETAIL})
+            await response(scope, receive, send)
+            return
+        
+        # Count streamed bytes in case the header is missing or wrong
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            return message
+        
+        await self.app(scope, limited_receive, send)
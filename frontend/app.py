@@ -5,6 +5,7 @@ Beautiful, modern UI for analyzing fashion images with AI
 
 import streamlit as st
 import requests
+import json
 from PIL import Image
 import io
 from pathlib import Path
@@ -79,7 +80,7 @@ with st.sidebar:
             st.success("✅ API Connected")
         else:
             st.error("❌ API Error")
-    except:
+    except requests.RequestException:
         st.error("❌ API Offline")
 
 # Main content
@@ -156,23 +157,39 @@ with tab1:
                         # Reset file pointer
                         uploaded_file.seek(0)
                         
-                        # Send to API
+                        # Send to API and render the analysis as it streams in
                         files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
-                        response = requests.post(f"{API_URL}/analyze", files=files)
+                        response = requests.post(f"{API_URL}/analyze/stream", files=files, stream=True)
                         
                         if response.status_code == 200:
-                            result = response.json()
+                            st.markdown("### 🤖 AI Analysis")
+                            placeholder = st.empty()
+                            analysis = ""
+                            image_info = None
+                            error = None
                             
-                            # Display success
-                            st.success("✅ Analysis Complete!")
+                            for line in response.iter_lines():
+                                if not line:
+                                    continue
+                                event = json.loads(line)
+                                if event["type"] == "image_info":
+                                    image_info = event["image_info"]
+                                elif event["type"] == "delta":
+                                    analysis += event["text"]
+                                    placeholder.markdown(analysis)
+                                elif event["type"] == "error":
+                                    error = event["detail"]
                             
-                            # Display analysis
-                            st.markdown("### 🤖 AI Analysis")
-                            st.markdown(result['analysis'])
+                            if error:
+                                st.error(f"❌ Error: {error}")
+                            else:
+                                # Display success
+                                st.success("✅ Analysis Complete!")
                             
                             # Display image info
-                            with st.expander("📊 Technical Details"):
-                                st.json(result['image_info'])
+                            if image_info:
+                                with st.expander("📊 Technical Details"):
+                                    st.json(image_info)
                         
                         else:
                             st.error(f"❌ Error: {response.json().get('detail', 'Unknown error')}")
@@ -222,8 +239,9 @@ with tab2:
             for idx, img_path in enumerate(image_files[:num_images]):
                 with cols[idx % 4]:
                     try:
-                        img = Image.open(img_path)
-                        st.image(img, caption=img_path.name, use_container_width=True)
+                        # Pass the path so Streamlit serves the file as-is
+                        # instead of decoding and re-encoding it with PIL
+                        st.image(str(img_path), caption=img_path.name, use_container_width=True)
                     except Exception as e:
                         st.error(f"Error loading image: {str(e)}")
         else:
@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration for running the FastAPI app in production.
+
+Usage:
+    gunicorn -c gunicorn_conf.py app.main:app
+"""
+
+import multiprocessing
+import os
+
+# Network
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Worker processes: each runs its own event loop, so blocking work in one
+# worker never stalls the others
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, 2 * multiprocessing.cpu_count() + 1)))
+# Exported so each worker sizes its image process pool to its share of the CPUs
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = 1000
+
+# Timeouts (Bedrock analyses can take tens of seconds)
+timeout = 180
+graceful_timeout = 30
+keepalive = 5
+
+# Logging
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
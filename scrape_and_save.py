@@ -4,11 +4,13 @@ One-click script to scrape all required images and save to disk.
 Uses HTTP-based API scraping - NO SELENIUM REQUIRED!
 """
 
+import asyncio
 import logging
 import time
-from scraper.mytheresa_api_scraper import MytheresaAPIScraper
+from scraper.mytheresa_api_scraper import STANDARD_CATEGORIES, MytheresaAPIScraper
 from scraper.image_downloader import ImageDownloader
-from scraper.config import IMAGES_DIR
+from scraper.checkpoint import CHECKPOINT_FILENAME, DownloadCheckpoint
+from scraper.config import CATEGORY_CONCURRENCY, IMAGES_DIR
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,12 +19,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def scrape_and_save_category(
+async def scrape_and_save_category(
     scraper: MytheresaAPIScraper,
     downloader: ImageDownloader,
-    scrape_func,
-    category: str,
-    limit: int
+    spec: dict
     ):
     """
     Scrape a category and save images to disk.
@@ -30,50 +30,94 @@ def scrape_and_save_category(
     Args:
         scraper: MytheresaAPIScraper instance
         downloader: ImageDownloader instance
-        scrape_func: Function to call for scraping
-        category: Category name
-        limit: Number of items to scrape
+        spec: Category spec with a "name" key plus scrape_category_async
+            arguments (see STANDARD_CATEGORIES)
     """
-    print(f"\n{'='*70}")
-    print(f"SCRAPING: {category.upper()} ({limit} items)")
-    print(f"{'='*70}")
+    category = spec["name"]
+    limit = spec["limit"]
+    
+    # Single print call so concurrent categories don't interleave the banner
+    print(f"\n{'='*70}\nSCRAPING: {category.upper()} ({limit} items)\n{'='*70}")
     
     # Step 1: Scrape URLs
-    logger.info(f"Step 1/2: Scraping URLs from mytheresa.com API...")
-    items = scrape_func(limit)
+    logger.info("Step 1/2: Scraping URLs from mytheresa.com API...")
+    items = await scraper.scrape_category_async(
+        **{key: value for key, value in spec.items() if key != "name"}
+    )
     
     if not items:
-        logger.warning(f"No items found for {category}")
+        logger.warning("No items found for %s", category)
         return
     
-    logger.info(f"✓ Found {len(items)} items")
+    logger.info("✓ Found %d items", len(items))
     
     # Step 2: Download and save images
-    logger.info(f"Step 2/2: Downloading and saving images...")
-    
-    downloaded = 0
-    for i, item in enumerate(items, 1):
-        filename = downloader.get_next_filename(category)
-        filepath = downloader.download_and_save(
-            item['image_url'],
-            category,
-            filename
-        )
-        
+    logger.info("Step 2/2: Downloading and saving images...")
+    
+    # Skip images already downloaded by an earlier (interrupted) run
+    checkpoint = DownloadCheckpoint(downloader.output_dir / category / CHECKPOINT_FILENAME)
+    pending = [item for item in items if item.image_url not in checkpoint]
+    if len(pending) < len(items):
+        logger.info("Resuming: %d images already downloaded", len(items) - len(pending))
+    
+    # Assign filenames up front so concurrent downloads never race on numbering
+    filenames = downloader.get_next_filenames(category, len(pending))
+    downloads = [(item.image_url, filename) for item, filename in zip(pending, filenames)]
+    
+    processed = 0
+    saved = 0
+    
+    def on_done(url, filepath):
+        nonlocal processed, saved
+        processed += 1
         if filepath:
-            downloaded += 1
+            saved += 1
+            checkpoint.add(url)
         
         # Progress update
-        if i % 10 == 0:
-            logger.info(f"Progress: {i}/{len(items)} processed, {downloaded} saved")
-        
-        # Small delay to be polite
-        time.sleep(0.1)  # Reduced delay since we're using API
+        if processed % 10 == 0:
+            logger.info("Progress: %d/%d processed, %d saved", processed, len(pending), saved)
     
-    logger.info(f"✓ COMPLETE: {downloaded}/{len(items)} images saved to scraper/data/{category}/")
+    # Concurrency is bounded inside download_many
+    with checkpoint:
+        downloaded = await downloader.download_many(downloads, category, on_done=on_done)
+    
+    logger.info("✓ COMPLETE: %d/%d images saved to scraper/data/%s/", downloaded, len(pending), category)
     print(f"\n✓ {category}: {downloaded} images saved")
 
 
+async def scrape_and_save_all(
+    scraper: MytheresaAPIScraper,
+    downloader: ImageDownloader,
+    specs: list
+    ):
+    """
+    Scrape and save several categories concurrently on one event loop.
+    
+    Every category shares the scraper's API connection; at most
+    CATEGORY_CONCURRENCY categories run at once.
+    
+    Args:
+        scraper: MytheresaAPIScraper instance
+        downloader: ImageDownloader instance
+        specs: Category specs (see STANDARD_CATEGORIES)
+    """
+    semaphore = asyncio.Semaphore(CATEGORY_CONCURRENCY)
+    
+    async def run_one(spec):
+        async with semaphore:
+            await scrape_and_save_category(scraper, downloader, spec)
+    
+    try:
+        results = await asyncio.gather(*(run_one(spec) for spec in specs), return_exceptions=True)
+    finally:
+        await scraper.aclose()
+    
+    for spec, result in zip(specs, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to scrape %s: %s", spec["name"], result)
+
+
 def main():
     """Run the complete automated scraping engine"""
     
@@ -95,30 +139,15 @@ def main():
     scraper = MytheresaAPIScraper()
     downloader = ImageDownloader()
     
-    # Define scraping tasks
-    tasks = [
-        (scraper.scrape_men_clothing, "men_clothing", 500),
-        (scraper.scrape_women_clothing, "women_clothing", 500),
-        (scraper.scrape_gucci_under_1000, "gucci_under_1000", 20),
-        (scraper.scrape_elie_saab, "elie_saab", 50),
-        (scraper.scrape_men_shoes, "men_shoes", 100),
-    ]
-    
-    # Execute all tasks
-    total_downloaded = 0
-    for scrape_func, category, limit in tasks:
-        try:
-            scrape_and_save_category(
-                scraper,
-                downloader,
-                scrape_func,
-                category,
-                limit
-            )
-            total_downloaded += downloader.get_download_count(category)
-        except Exception as e:
-            logger.error(f"Failed to scrape {category}: {str(e)}")
-            continue
+    # Execute tasks concurrently; categories are independent, and the
+    # scraper/downloader share one API connection and rate limits
+    asyncio.run(scrape_and_save_all(scraper, downloader, STANDARD_CATEGORIES))
+    
+    # Finish pending image writes
+    downloader.close()
+    
+    categories = [spec["name"] for spec in STANDARD_CATEGORIES]
+    total_downloaded = sum(downloader.get_download_count(category) for category in categories)
     
     # Final summary
     print("\n" + "=" * 70)
@@ -127,7 +156,7 @@ def main():
     print(f"\nTotal images downloaded: {total_downloaded}")
     print(f"Images location: {IMAGES_DIR}")
     print("\nBreakdown:")
-    for _, category, _ in tasks:
+    for category in categories:
         count = downloader.get_download_count(category)
         print(f"  - {category}: {count} images")
     
@@ -3,16 +3,38 @@ HTTP client for Mytheresa GraphQL API
 Handles all HTTP communication with the API
 """
 
+import asyncio
 import httpx
 import logging
-from typing import Dict, Optional
+import orjson
+import re
+from typing import Dict, List, Optional, Set
+
+from scraper.config import MAX_RETRIES, RATE_LIMIT_BURST, RATE_LIMIT_RPS, RETRY_STATUSES
+from scraper.graphql_queries import persisted_query_hash
+from scraper.rate_limiter import TokenBucket, backoff_delay
 
 logger = logging.getLogger(__name__)
 
+# Error for a hash-only request the server tried to run without query text
+_MISSING_QUERY = re.compile(
+    r"(must provide|missing|no)\s+(a\s+)?query|query\b.*\b(is required|is missing)",
+    re.IGNORECASE
+)
+
 
 class MytheresaAPIClient:
     """
     Low-level HTTP client for Mytheresa's GraphQL API
+    
+    Holds one long-lived async HTTP/2 client, so every query (and every
+    category scraped on the same event loop) reuses one connection; await
+    aclose() before the event loop ends. Queries are rate limited with a
+    token bucket and retried with backoff on 429/503.
+    
+    Queries are sent as Automatic Persisted Queries (hash only, full text
+    only on a cache miss); if the server does not support them the client
+    falls back to plain queries for the rest of its lifetime.
     """
     
     def __init__(self):
@@ -21,16 +43,56 @@ class MytheresaAPIClient:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'en',
+            'Accept-Encoding': 'gzip, deflate, br',  # httpx decodes br via the brotli extra
             'Content-Type': 'application/json',
             'Referer': 'https://www.mytheresa.com/',
             'Origin': 'https://www.mytheresa.com',
             'X-Store': 'us',
             'X-Country': 'US',
         }
+        # Created on first use, since an async client belongs to one event loop
+        self._session: Optional[httpx.AsyncClient] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._limiter = TokenBucket(RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+        
+        # Persisted query state: None until the server has answered a
+        # hash-only request, then whether APQ works
+        self._apq_supported: Optional[bool] = None
+        self._registered_hashes: Set[str] = set()
+    
+    def _get_session(self) -> httpx.AsyncClient:
+        """
+        Get the shared async client for the running event loop.
+        
+        Concurrent queries are multiplexed over a single HTTP/2 connection.
+        A client left over from an earlier, finished event loop cannot be
+        reused, so a fresh one is created in that case.
+        
+        Returns:
+            httpx.AsyncClient
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session_loop is not loop:
+            self._session = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                headers=self.default_headers,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=20)
+            )
+            self._session_loop = loop
+        return self._session
     
-    def execute_query(
-        self, 
-        query: str, 
+    async def aclose(self):
+        """Close the shared connection (call on the loop that used it)"""
+        if self._session is not None:
+            session = self._session
+            self._session = None
+            self._session_loop = None
+            await session.aclose()
+    
+    async def execute_query_async(
+        self,
+        query: str,
         variables: Dict,
         section: str = 'men'
       ) -> Optional[Dict]:
@@ -46,34 +108,209 @@ class MytheresaAPIClient:
             Response data or None if error
         """
         try:
-            # Prepare headers with section
-            headers = self.default_headers.copy()
-            headers['X-Section'] = section
+            query_hash = persisted_query_hash(query)
             
-            # Prepare payload
-            payload = {
-                "query": query,
-                "variables": variables
-            }
+            # Try the hash alone first; the server answers from its cache
+            if self._apq_supported is not False:
+                response = await self._post_async(
+                    self._build_payload(query_hash, variables), section
+                )
+                if not self._needs_full_query(query_hash, response):
+                    return self._handle_response(response)
             
-            # Execute request
-            with httpx.Client(http2=True, timeout=30.0) as client:
-                response = client.post(self.base_url, json=payload, headers=headers)
-                
-                if response.status_code != 200:
-                    logger.error(f"API returned status {response.status_code}")
-                    return None
-                
-                data = response.json()
-                
-                # Check for GraphQL errors
-                if 'errors' in data and data['errors']:
-                    error_msg = data['errors'][0].get('message', 'Unknown error')
-                    logger.error(f"GraphQL error: {error_msg}")
-                    return None
-                
-                return data
+            response = await self._post_async(
+                self._build_payload(query_hash, variables, query), section
+            )
+            self._note_registered(query_hash, response)
+            return self._handle_response(response)
         
         except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
+            logger.error("Request failed: %s", e)
+            return None
+    
+    def _build_payload(self, query_hash: str, variables: Dict, query: Optional[str] = None) -> bytes:
+        """
+        Serialize a GraphQL request body
+        
+        Args:
+            query_hash: Persisted query hash
+            variables: Query variables
+            query: Full query text (omitted for hash-only requests)
+            
+        Returns:
+            JSON-encoded payload
+        """
+        payload = {"variables": variables}
+        if query is not None:
+            payload["query"] = query
+        if self._apq_supported is not False:
+            payload["extensions"] = {
+                "persistedQuery": {"version": 1, "sha256Hash": query_hash}
+            }
+        return orjson.dumps(payload)
+    
+    async def _post_async(self, payload: bytes, section: str) -> httpx.Response:
+        """
+        POST a payload, rate limited and retried on 429/503
+        
+        Args:
+            payload: JSON-encoded request body
+            section: Section ('men' or 'women')
+            
+        Returns:
+            Final HTTP response
+        """
+        # Default headers are set on the shared client
+        session = self._get_session()
+        for attempt in range(MAX_RETRIES + 1):
+            await self._limiter.acquire_async()
+            response = await session.post(
+                self.base_url, content=payload, headers={'X-Section': section}
+            )
+            
+            if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                logger.warning("API returned status %d, retrying in %.1fs", response.status_code, delay)
+                await asyncio.sleep(delay)
+                continue
+            
+            return response
+    
+    def _needs_full_query(self, query_hash: str, response: httpx.Response) -> bool:
+        """
+        Decide whether a hash-only request must be resent with the full query
+        
+        Also records whether the server supports persisted queries.
+        
+        Args:
+            query_hash: Persisted query hash that was sent
+            response: Response to the hash-only request
+            
+        Returns:
+            True if the full query should be sent
+        """
+        error = self._persisted_query_error(response)
+        
+        if error == 'not_found':
+            # A miss for a hash we already sent in full means nothing is being cached
+            if query_hash in self._registered_hashes:
+                self._disable_apq()
+            return True
+        
+        # Explicitly unsupported, or the server ignored the hash and wanted query text
+        if error == 'not_supported' or self._is_missing_query_error(response):
+            self._disable_apq()
+            return True
+        
+        if response.status_code == 200 and not self._graphql_errors(response):
+            self._apq_supported = True
+            return False
+        
+        if self._apq_supported:
+            return False  # Ordinary failure; handled by the caller
+        
+        # Still unknown (429/5xx, other errors): send this request in full
+        # without deciding anything about persisted query support
+        return True
+    
+    def _disable_apq(self):
+        """Send full queries only, for the rest of the client's lifetime"""
+        logger.info("Persisted queries not supported by the API, sending full queries")
+        self._apq_supported = False
+    
+    @staticmethod
+    def _graphql_errors(response: httpx.Response) -> List[Dict]:
+        """
+        Get the GraphQL errors of a response
+        
+        Args:
+            response: HTTP response
+            
+        Returns:
+            List of error objects (empty if none or the body is not JSON)
+        """
+        try:
+            data = orjson.loads(response.content)
+        except Exception:
+            return []
+        if not isinstance(data, dict):
+            return []
+        return data.get('errors') or []
+    
+    @classmethod
+    def _is_missing_query_error(cls, response: httpx.Response) -> bool:
+        """
+        Detect a server rejecting a hash-only request for lacking the query text
+        
+        Args:
+            response: Response to a hash-only request
+            
+        Returns:
+            True for a 200/4xx (other than 429) whose error names the missing query
+        """
+        status = response.status_code
+        if status != 200 and not (400 <= status < 500 and status != 429):
+            return False
+        
+        messages = [error.get('message', '') for error in cls._graphql_errors(response)]
+        if not messages and status != 200:
+            messages = [response.text]  # Plain-text 4xx body
+        return any(_MISSING_QUERY.search(message) for message in messages)
+    
+    def _note_registered(self, query_hash: str, response: httpx.Response):
+        """Remember that the server has now seen the full text for a hash"""
+        if self._apq_supported is not False and response.status_code == 200:
+            self._registered_hashes.add(query_hash)
+    
+    @staticmethod
+    def _persisted_query_error(response: httpx.Response) -> Optional[str]:
+        """
+        Detect an Automatic Persisted Query error response
+        
+        Args:
+            response: HTTP response
+            
+        Returns:
+            'not_found', 'not_supported' or None
+        """
+        body = response.content
+        if b'PersistedQuery' not in body and b'PERSISTED_QUERY' not in body:
+            return None
+        
+        try:
+            errors = orjson.loads(body).get('errors') or []
+        except Exception:
+            return None
+        
+        for error in errors:
+            code = (error.get('extensions') or {}).get('code', '')
+            message = error.get('message', '')
+            if code == 'PERSISTED_QUERY_NOT_FOUND' or message == 'PersistedQueryNotFound':
+                return 'not_found'
+            if code == 'PERSISTED_QUERY_NOT_SUPPORTED' or message == 'PersistedQueryNotSupported':
+                return 'not_supported'
+        return None
+    
+    def _handle_response(self, response: httpx.Response) -> Optional[Dict]:
+        """
+        Check status and GraphQL errors of an API response
+        
+        Args:
+            response: HTTP response
+            
+        Returns:
+            Response data or None if error
+        """
+        if response.status_code != 200:
+            logger.error("API returned status %d", response.status_code)
             return None
+        
+        data = orjson.loads(response.content)
+        
+        # Check for GraphQL errors
+        if 'errors' in data and data['errors']:
+            error_msg = data['errors'][0].get('message', 'Unknown error')
+            logger.error("GraphQL error: %s", error_msg)
+            return None
+        
+        return data
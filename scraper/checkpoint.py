@@ -0,0 +1,94 @@
+"""
+Resume checkpoints for image downloads.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Stored inside each category folder; dotfile so it is not counted as an image
+CHECKPOINT_FILENAME = ".checkpoint.json"
+
+
+class DownloadCheckpoint:
+    """
+    Set of image URLs already downloaded for a category, persisted to disk.
+    
+    URLs are stored hashed. Additions are flushed every flush_every items
+    and on close(), using an atomic replace so an interrupted run never
+    leaves a corrupt file. Delete the file to force a full re-download.
+    """
+    
+    def __init__(self, path: Path, flush_every: int = 20):
+        """
+        Load checkpoint.
+        
+        Args:
+            path: Checkpoint file path
+            flush_every: Write to disk after this many new URLs
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._done = set()
+        
+        if path.exists():
+            try:
+                with open(path, 'r') as f:
+                    self._done = set(json.load(f))
+            except Exception as e:
+                logger.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+    
+    @staticmethod
+    def _hash(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+    
+    def __contains__(self, url: str) -> bool:
+        return self._hash(url) in self._done
+    
+    def __len__(self) -> int:
+        return len(self._done)
+    
+    def add(self, url: str):
+        """
+        Record a downloaded URL (thread-safe).
+        
+        Args:
+            url: Image URL
+        """
+        with self._lock:
+            self._done.add(self._hash(url))
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._write()
+    
+    def flush(self):
+        """Write any unsaved URLs to disk"""
+        with self._lock:
+            if self._pending:
+                self._write()
+    
+    def close(self):
+        """Flush and release the checkpoint"""
+        self.flush()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _write(self):
+        """Atomically replace the checkpoint file (caller holds the lock)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(sorted(self._done), f)
+        os.replace(tmp_path, self.path)
+        self._pending = 0
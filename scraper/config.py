@@ -2,15 +2,21 @@
 Configuration for Mytheresa scraper.
 """
 
+from functools import lru_cache
 from pathlib import Path
 
 # Output directories
 RESULTS_DIR = Path("scraper/results")
-RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
-# Images directory - where scraped images are saved
+# Images directory - where scraped images are saved (created on first use, not at import)
 IMAGES_DIR = Path("scraper/data")
-IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@lru_cache(maxsize=1)
+def ensure_images_dir() -> Path:
+    """Create the images directory once and return it"""
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    return IMAGES_DIR
 
 # Mytheresa URLs
 BASE_URL = "https://www.mytheresa.com"
@@ -26,6 +32,16 @@ PAGE_LOAD_TIMEOUT = 30  # seconds
 MAX_RETRIES = 3
 ELEMENT_WAIT_TIME = 10  # seconds to wait for elements
 
+# API scraping settings
+PAGE_SIZE = 60  # products per GraphQL listing page
+PAGE_CONCURRENCY = 4  # listing pages requested at once
+DOWNLOAD_CONCURRENCY = 32  # image downloads in flight at once (per category)
+CATEGORY_CONCURRENCY = 3  # categories scraped at once
+RATE_LIMIT_RPS = 10  # sustained requests per second, per host (API and image CDN)
+RATE_LIMIT_BURST = 20  # requests allowed in a burst before throttling
+RETRY_STATUSES = (429, 503)  # rate-limit responses retried with backoff
+DOWNLOAD_RETRY_STATUSES = (429, 500, 502, 503, 504)  # image CDN: also transient server errors
+
 # Selenium settings
 HEADLESS = True  # Run browser in background
 WINDOW_SIZE = "1920,1080"
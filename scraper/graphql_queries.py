@@ -2,6 +2,9 @@
 GraphQL query definitions for Mytheresa API
 """
 
+import hashlib
+from functools import lru_cache
+
 
 # Product listing query with all necessary fields
 PRODUCT_LISTING_QUERY = """query XProductListingPageQuery($filtersQueryParams: String, $page: Int, $size: Int, $slug: String, $sort: String) {
@@ -37,6 +40,20 @@ PRODUCT_LISTING_QUERY = """query XProductListingPageQuery($filtersQueryParams: S
 }"""
 
 
+@lru_cache(maxsize=None)
+def persisted_query_hash(query: str) -> str:
+    """
+    SHA-256 of a query, as used by Automatic Persisted Queries
+    
+    Args:
+        query: GraphQL query string
+        
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
 def build_listing_variables(
     slug: str,
     page: int = 1,
@@ -2,11 +2,24 @@
 Download and save images to disk.
 """
 
-import requests
+import asyncio
+import httpx
 import logging
+import os
+import queue
+import re
+import threading
 from pathlib import Path
-from typing import Optional
-from scraper.config import IMAGES_DIR
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from scraper.config import (
+    DOWNLOAD_CONCURRENCY,
+    DOWNLOAD_RETRY_STATUSES,
+    MAX_RETRIES,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_RPS,
+    ensure_images_dir
+)
+from scraper.rate_limiter import TokenBucket, backoff_delay
 
 logger = logging.getLogger(__name__)
 
@@ -17,29 +30,87 @@ HEADERS = {
 
 
 class ImageDownloader:
-    """Download and save images to disk"""
+    """
+    Download and save images to disk
     
-    def __init__(self, output_dir: Path = IMAGES_DIR):
+    download_many fetches images concurrently on one event loop instead of
+    one thread per download, rate limited by a token bucket and retrying
+    429/5xx responses, connection errors and timeouts with backoff. Call
+    close() (or use as a context manager) when done. Downloaded bytes are
+    handed to a single background writer thread through a bounded queue,
+    so disk latency never stalls the network side.
+    """
+    
+    def __init__(self, output_dir: Optional[Path] = None):
         """
         Initialize downloader.
         
         Args:
-            output_dir: Directory to save images
+            output_dir: Directory to save images (default: IMAGES_DIR)
         """
+        if output_dir is None:
+            output_dir = ensure_images_dir()
+        else:
+            output_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir = output_dir
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Last filename index handed out per (category, extension), and
+        # category dirs known to exist; avoids a directory scan per image
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._created_dirs: Set[str] = set()
+        self._lock = threading.Lock()
+        
+        # Shared by every category's downloads, so the CDN sees one overall rate
+        self._limiter = TokenBucket(RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+        
+        # Disk writer for async downloads; bounded so downloads back off
+        # when the disk falls behind
+        self._write_q: queue.Queue = queue.Queue(maxsize=64)
+        self._writer: Optional[threading.Thread] = None
+    
+    def async_session(self) -> httpx.AsyncClient:
+        """
+        Create an async client for download_and_save_async.
+        
+        Returns:
+            New httpx.AsyncClient (use as an async context manager)
+        """
+        return httpx.AsyncClient(
+            http2=True,
+            headers=HEADERS,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=64)
+        )
     
-    def download_and_save(
-        self, 
-        url: str, 
-        category: str, 
+    def flush(self):
+        """Block until every queued image has been written to disk"""
+        self._write_q.join()
+    
+    def close(self):
+        """Finish pending writes and stop the writer thread"""
+        if self._writer is not None:
+            self._write_q.put(None)
+            self._writer.join()
+            self._writer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    async def download_and_save_async(
+        self,
+        session: httpx.AsyncClient,
+        url: str,
+        category: str,
         filename: str,
         timeout: int = 10
      ) -> Optional[str]:
         """
-        Download image from URL and save to disk.
+        Download image from URL and save it via the writer thread.
         
         Args:
+            session: Client from async_session()
             url: Image URL
             category: Category folder name
             filename: Filename to save as
@@ -50,25 +121,138 @@ class ImageDownloader:
         """
         try:
             # Create category directory
-            category_dir = self.output_dir / category
-            category_dir.mkdir(exist_ok=True)
+            category_dir = self._category_dir(category)
+            filepath = category_dir / filename
             
-            # Download image
-            response = requests.get(url, headers=HEADERS, timeout=timeout)
-            response.raise_for_status()
+            for attempt in range(MAX_RETRIES + 1):
+                await self._limiter.acquire_async()
+                try:
+                    response = await session.get(url, timeout=timeout)
+                except httpx.TransportError as e:
+                    # Connection errors and timeouts are usually transient
+                    if attempt == MAX_RETRIES:
+                        raise
+                    delay = backoff_delay(attempt)
+                    logger.warning("Image download failed (%s), retrying in %.1fs", e, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                
+                if response.status_code in DOWNLOAD_RETRY_STATUSES and attempt < MAX_RETRIES:
+                    delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                    logger.warning("Image CDN returned status %d, retrying in %.1fs", response.status_code, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                
+                response.raise_for_status()
+                break
             
-            # Save to disk
-            filepath = category_dir / filename
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            # Hand the bytes to the writer thread and wait for the result;
+            # other downloads keep running meanwhile
+            written = asyncio.get_running_loop().create_future()
+            await self._enqueue_write((filepath, response.content, written))
+            await written
             
-            logger.info(f"✓ Downloaded: {category}/{filename}")
+            logger.info("✓ Downloaded: %s/%s", category, filename)
             return str(filepath)
         
         except Exception as e:
-            logger.error(f"✗ Failed to download {url}: {str(e)}")
+            logger.error("✗ Failed to download %s: %s", url, e)
             return None
     
+    async def _enqueue_write(self, job: Tuple[Path, bytes, asyncio.Future]):
+        """
+        Queue an image for the writer thread, waiting off-loop if the queue is full.
+        
+        Args:
+            job: (file path, image bytes, future resolved when written)
+        """
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._writer_loop, name="image-writer", daemon=True)
+                    self._writer.start()
+        
+        try:
+            self._write_q.put_nowait(job)
+        except queue.Full:
+            await asyncio.to_thread(self._write_q.put, job)
+    
+    @staticmethod
+    def _write_file(filepath: Path, data: bytes):
+        """
+        Write a whole image with raw os.write calls, bypassing Python's buffered file layer.
+        
+        Args:
+            filepath: Destination path
+            data: Image bytes
+        """
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                # os.write may write less than requested
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+    
+    def _writer_loop(self):
+        """Write queued images to disk until a None sentinel arrives"""
+        while True:
+            job = self._write_q.get()
+            try:
+                if job is None:
+                    return
+                
+                filepath, data, written = job
+                loop = written.get_loop()
+                try:
+                    self._write_file(filepath, data)
+                except Exception as e:
+                    # Don't leave a truncated image behind
+                    filepath.unlink(missing_ok=True)
+                    loop.call_soon_threadsafe(_resolve_write, written, e)
+                else:
+                    loop.call_soon_threadsafe(_resolve_write, written, None)
+            finally:
+                self._write_q.task_done()
+    
+    async def download_many(
+        self,
+        downloads: List[Tuple[str, str]],
+        category: str,
+        on_done: Optional[Callable[[str, Optional[str]], None]] = None,
+        concurrency: int = DOWNLOAD_CONCURRENCY
+     ) -> int:
+        """
+        Download many images concurrently.
+        
+        Args:
+            downloads: (url, filename) pairs
+            category: Category folder name
+            on_done: Called with (url, saved path or None) as each download finishes
+            concurrency: Maximum downloads in flight
+            
+        Returns:
+            Number of images saved
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async with self.async_session() as session:
+            async def download_one(url: str, filename: str) -> Tuple[str, Optional[str]]:
+                async with semaphore:
+                    return url, await self.download_and_save_async(session, url, category, filename)
+            
+            saved = 0
+            tasks = [download_one(url, filename) for url, filename in downloads]
+            for task in asyncio.as_completed(tasks):
+                url, filepath = await task
+                if filepath:
+                    saved += 1
+                if on_done:
+                    on_done(url, filepath)
+        
+        return saved
+    
     def get_next_filename(self, category: str, extension: str = "jpg") -> str:
         """
         Get next available filename in category.
@@ -80,13 +264,71 @@ class ImageDownloader:
         Returns:
             Next filename
         """
+        return self.get_next_filenames(category, 1, extension)[0]
+    
+    def get_next_filenames(self, category: str, count: int, extension: str = "jpg") -> List[str]:
+        """
+        Reserve a block of filenames in category, for concurrent downloads.
+        
+        Numbering continues after the highest existing index (not the file
+        count), so gaps left by failed downloads never lead to overwrites.
+        The directory is scanned once per category; later calls only bump
+        an in-memory counter. Safe to call from multiple threads.
+        
+        Args:
+            category: Category name
+            count: Number of filenames needed
+            extension: File extension
+            
+        Returns:
+            List of filenames
+        """
+        key = (category, extension)
+        with self._lock:
+            if key not in self._counters:
+                self._counters[key] = self._highest_index(category, extension)
+            start = self._counters[key] + 1
+            self._counters[key] += count
+        
+        return [f"{category}_{num}.{extension}" for num in range(start, start + count)]
+    
+    def _category_dir(self, category: str) -> Path:
+        """
+        Get a category directory, creating it on first use.
+        
+        Args:
+            category: Category name
+            
+        Returns:
+            Category directory path
+        """
         category_dir = self.output_dir / category
-        category_dir.mkdir(exist_ok=True)
+        if category not in self._created_dirs:
+            category_dir.mkdir(exist_ok=True)
+            self._created_dirs.add(category)
+        return category_dir
+    
+    def _highest_index(self, category: str, extension: str) -> int:
+        """
+        Find the highest numbered "<category>_<n>.<extension>" file on disk.
         
-        existing = list(category_dir.glob(f"*.{extension}"))
-        next_num = len(existing) + 1
+        Args:
+            category: Category name
+            extension: File extension
+            
+        Returns:
+            Highest index, or 0 if there are none
+        """
+        category_dir = self._category_dir(category)
         
-        return f"{category}_{next_num}.{extension}"
+        pattern = re.compile(rf"^{re.escape(category)}_(\d+)\.{re.escape(extension)}$")
+        with os.scandir(category_dir) as entries:
+            indices = [
+                int(match.group(1))
+                for match in (pattern.match(entry.name) for entry in entries)
+                if match
+            ]
+        return max(indices, default=0)
     
     def get_download_count(self, category: str) -> int:
         """
@@ -102,4 +344,20 @@ class ImageDownloader:
         if not category_dir.exists():
             return 0
         
-        return len(list(category_dir.glob("*.*")))
+        # One readdir pass without building Path objects; dotfiles (e.g. the
+        # resume checkpoint) are not images
+        with os.scandir(category_dir) as entries:
+            return sum(
+                1 for entry in entries
+                if not entry.name.startswith('.') and '.' in entry.name and entry.is_file()
+            )
+
+
+def _resolve_write(written: asyncio.Future, error: Optional[Exception]):
+    """Report a writer-thread result to the waiting download (runs on its event loop)"""
+    if written.done():
+        return
+    if error is not None:
+        written.set_exception(error)
+    else:
+        written.set_result(None)
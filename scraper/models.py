@@ -11,6 +11,13 @@ class Product:
     """
     Product data model
     """
+    # Explicit slots (dataclass(slots=True) needs Python 3.10+): no
+    # per-instance __dict__, less memory per scraped product
+    __slots__ = (
+        'image_url', 'brand', 'name', 'price', 'sku',
+        'slug', 'color', 'description', 'has_stock',
+    )
+    
     image_url: str
     brand: str
     name: str
@@ -3,25 +3,64 @@ Mytheresa API Scraper - Professional modular version
 Uses pure HTTP requests via GraphQL API 
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import math
+from typing import List, Dict, Optional, Tuple
 
 from scraper.api_client import MytheresaAPIClient
+from scraper.config import CATEGORY_CONCURRENCY, PAGE_CONCURRENCY, PAGE_SIZE
 from scraper.graphql_queries import PRODUCT_LISTING_QUERY, build_listing_variables
 from scraper.models import Product
 
 logger = logging.getLogger(__name__)
 
+# Categories scraped by scrape_all and scrape_and_save.py
+STANDARD_CATEGORIES = [
+    {"name": "men_clothing", "category_slug": "/clothing", "limit": 500, "section": 'men'},
+    {"name": "women_clothing", "category_slug": "/clothing", "limit": 500, "section": 'women'},
+    {"name": "gucci_under_1000", "category_slug": "/designers/gucci", "limit": 20,
+     "max_price": 1000, "section": 'men'},
+    {"name": "elie_saab", "category_slug": "/designers/elie-saab", "limit": 50, "section": 'women'},
+    {"name": "men_shoes", "category_slug": "/shoes", "limit": 100, "section": 'men'},
+]
+
 
 class MytheresaAPIScraper:
     """
     High-level scraper for Mytheresa products
     Uses GraphQL API for fast, reliable scraping
+    
+    One API connection is shared by every category scraped on the same
+    event loop. The sync methods close it when they return; async callers
+    await aclose() when done.
     """
     
     def __init__(self):
         self.client = MytheresaAPIClient()
     
+    async def aclose(self):
+        """Close the underlying API connection"""
+        await self.client.aclose()
+    
+    def _run(self, coro):
+        """
+        Run a coroutine on a new event loop, closing the connection afterwards
+        
+        Args:
+            coro: Coroutine to run
+            
+        Returns:
+            Coroutine result
+        """
+        async def run_and_close():
+            try:
+                return await coro
+            finally:
+                await self.aclose()
+        
+        return asyncio.run(run_and_close())
+    
     def scrape_category(
         self, 
         category_slug: str, 
@@ -29,7 +68,7 @@ class MytheresaAPIScraper:
         brand_filter: Optional[str] = None,
         max_price: Optional[float] = None,
         section: Optional[str] = None
-        ) -> List[Dict]:
+        ) -> List[Product]:
         """
         Scrape products from a category
         
@@ -41,90 +80,232 @@ class MytheresaAPIScraper:
             section: Force section to 'men' or 'women' (optional, auto-detected)
             
         Returns:
-            List of product dictionaries
+            List of Product objects
+        """
+        return self._run(self.scrape_category_async(
+            category_slug,
+            limit=limit,
+            brand_filter=brand_filter,
+            max_price=max_price,
+            section=section
+        ))
+    
+    async def scrape_category_async(
+        self, 
+        category_slug: str, 
+        limit: int = 100,
+        brand_filter: Optional[str] = None,
+        max_price: Optional[float] = None,
+        section: Optional[str] = None
+        ) -> List[Product]:
+        """
+        Scrape products from a category, fetching several pages concurrently
+        
+        The first page's pagination metadata bounds the page range; the
+        remaining pages are requested PAGE_CONCURRENCY at a time over one
+        HTTP/2 connection and processed in page order, so results match a
+        sequential scrape.
+        
+        Args:
+            category_slug: Category slug (e.g., "/clothing", "/designers/gucci")
+            limit: Maximum products to return
+            brand_filter: Filter by brand name (optional)
+            max_price: Maximum price filter (optional)
+            section: Force section to 'men' or 'women' (optional, auto-detected)
+            
+        Returns:
+            List of Product objects
         """
         all_products = []
-        page = 1
+        seen_images = set()  # listings can shift between page requests
+        last_page_reached = False
+        
+        # Filter invariants, computed once rather than per product
+        brand_lower = brand_filter.lower() if brand_filter else None
+        price_cap = max_price if max_price else math.inf
         
         # Determine section if not provided
         if section is None:
             section = self._detect_section(category_slug)
         
-        logger.info(f"Scraping category: {category_slug} (section: {section})")
+        logger.info("Scraping category: %s (section: %s)", category_slug, section)
         
-        while len(all_products) < limit:
-            logger.info(f"Fetching page {page}...")
-            
-            products = self._fetch_page(category_slug, page, section)
-            
-            if not products:
-                logger.info("No more products found")
-                break
-            
-            # Apply filters
-            for product in products:
-                if len(all_products) >= limit:
+        semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+        
+        # Page 1 alone: its pagination metadata tells us how many pages to gather
+        products, pagination = await self._fetch_page_async(
+            semaphore, category_slug, 1, section
+        )
+        results = [products]
+        last_page = self._last_page(pagination)
+        # Only an unfiltered scrape can predict how many more pages it needs
+        estimate_pages = not (brand_filter or max_price)
+        page = 2
+        
+        while True:
+            for products in results:
+                if not products:
+                    logger.info("No more products found")
+                    last_page_reached = True
                     break
                 
-                # Brand filter
-                if brand_filter and brand_filter.lower() not in product.brand.lower():
-                    continue
-                
-                # Price filter
-                if max_price and product.price and product.price > max_price:
-                    continue
+                # Apply filters
+                for product in products:
+                    if len(all_products) >= limit:
+                        break
+                    
+                    # Skip products already seen on an earlier page
+                    if product.image_url in seen_images:
+                        continue
+                    seen_images.add(product.image_url)
+                    
+                    # Brand filter
+                    if brand_lower and brand_lower not in product.brand.lower():
+                        continue
+                    
+                    # Price filter
+                    if product.price and product.price > price_cap:
+                        continue
+                    
+                    all_products.append(product)
                 
-                all_products.append(product.to_dict())
-            
-            page += 1
+                # Stop if we got fewer products than expected (last page)
+                if len(products) < PAGE_SIZE:
+                    last_page_reached = True
+                    break
             
-            # Stop if we got fewer products than expected (last page)
-            if len(products) < 60:
+            if last_page_reached or len(all_products) >= limit \
+                    or (last_page is not None and page > last_page):
                 break
+            
+            end = page + PAGE_CONCURRENCY - 1
+            if last_page is not None:
+                end = min(end, last_page)
+            # Assuming full pages, the remaining products need this many
+            # more pages. That is only an estimate: duplicates skipped above
+            # act like a filter, so a short result simply fetches the next
+            # batch, until totalPages is reached
+            if estimate_pages:
+                end = min(end, page - 1 + math.ceil((limit - len(all_products)) / PAGE_SIZE))
+            logger.info("Fetching pages %d-%d...", page, end)
+            
+            fetched = await asyncio.gather(*(
+                self._fetch_page_async(semaphore, category_slug, p, section)
+                for p in range(page, end + 1)
+            ))
+            results = [products for products, _ in fetched]
+            page = end + 1
         
-        logger.info(f"✓ Scraped {len(all_products)} products")
+        logger.info("✓ Scraped %d products", len(all_products))
         return all_products[:limit]
     
-    def _fetch_page(
-        self, 
+    def scrape_categories(self, specs: List[Dict]) -> Dict[str, List[Product]]:
+        """
+        Scrape several categories concurrently
+        
+        Args:
+            specs: One dict per category with a "name" key plus
+                scrape_category arguments ("category_slug", "limit",
+                "brand_filter", "max_price", "section")
+            
+        Returns:
+            Dict mapping each spec's name to its products
+        """
+        return self._run(self.scrape_categories_async(specs))
+    
+    async def scrape_categories_async(self, specs: List[Dict]) -> Dict[str, List[Product]]:
+        """
+        Scrape several categories concurrently on one event loop
+        
+        At most CATEGORY_CONCURRENCY categories run at once; each still
+        fetches its own pages concurrently. A failed category yields an
+        empty list.
+        
+        Args:
+            specs: One dict per category with a "name" key plus
+                scrape_category arguments ("category_slug", "limit",
+                "brand_filter", "max_price", "section")
+            
+        Returns:
+            Dict mapping each spec's name to its products
+        """
+        semaphore = asyncio.Semaphore(CATEGORY_CONCURRENCY)
+        
+        async def scrape_one(spec: Dict) -> List[Product]:
+            kwargs = {key: value for key, value in spec.items() if key != 'name'}
+            async with semaphore:
+                return await self.scrape_category_async(**kwargs)
+        
+        results = await asyncio.gather(
+            *(scrape_one(spec) for spec in specs), return_exceptions=True
+        )
+        
+        scraped = {}
+        for spec, result in zip(specs, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to scrape %s: %s", spec['name'], result)
+                result = []
+            scraped[spec['name']] = result
+        return scraped
+    
+    async def _fetch_page_async(
+        self,
+        semaphore: asyncio.Semaphore,
         category_slug: str, 
         page: int, 
         section: str
-        ) -> List[Product]:
+        ) -> Tuple[List[Product], Optional[Dict]]:
         """
         Fetch a single page of products
         
         Args:
+            semaphore: Limits concurrent page requests
             category_slug: Category slug
             page: Page number (1-indexed)
             section: Section ('men' or 'women')
             
         Returns:
-            List of Product objects
+            Tuple of (Product objects, pagination info or None)
         """
         # Build query variables
         variables = build_listing_variables(
             slug=category_slug,
             page=page,
-            size=60
+            size=PAGE_SIZE
         )
         
         # Execute query
-        data = self.client.execute_query(
-            query=PRODUCT_LISTING_QUERY,
-            variables=variables,
-            section=section
-        )
+        async with semaphore:
+            data = await self.client.execute_query_async(
+                query=PRODUCT_LISTING_QUERY,
+                variables=variables,
+                section=section
+            )
         
         if not data:
-            return []
+            return [], None
         
         # Parse products
         products = self._parse_products(data)
+        pagination = (data.get('data') or {}).get('xProductListingPage', {}).get('pagination')
         
-        logger.info(f"  Found {len(products)} products on page {page}")
+        logger.info("  Found %d products on page %d", len(products), page)
         
-        return products
+        return products, pagination
+    
+    def _last_page(self, pagination: Optional[Dict]) -> Optional[int]:
+        """
+        Get the last page of a listing
+        
+        Args:
+            pagination: Pagination info from the first page (may be None)
+            
+        Returns:
+            Last page number (totalPages), or None if unknown
+        """
+        if pagination and pagination.get('totalPages'):
+            return pagination['totalPages']
+        return None
     
     def _parse_products(self, data: Dict) -> List[Product]:
         """
@@ -147,7 +328,7 @@ class MytheresaAPIScraper:
                     products.append(product)
         
         except Exception as e:
-            logger.error(f"Error parsing products: {str(e)}")
+            logger.error("Error parsing products: %s", e)
         
         return products
     
@@ -170,19 +351,23 @@ class MytheresaAPIScraper:
     
     # Convenience methods for specific categories
     
-    def scrape_men_clothing(self, limit: int = 500) -> List[Dict]:
+    def scrape_all(self) -> Dict[str, List[Product]]:
+        """Scrape all STANDARD_CATEGORIES concurrently over one connection"""
+        return self.scrape_categories(STANDARD_CATEGORIES)
+    
+    def scrape_men_clothing(self, limit: int = 500) -> List[Product]:
         """Scrape men's clothing"""
         return self.scrape_category("/clothing", limit=limit, section='men')
     
-    def scrape_women_clothing(self, limit: int = 500) -> List[Dict]:
+    def scrape_women_clothing(self, limit: int = 500) -> List[Product]:
         """Scrape women's clothing"""
         return self.scrape_category("/clothing", limit=limit, section='women')
     
-    def scrape_men_shoes(self, limit: int = 100) -> List[Dict]:
+    def scrape_men_shoes(self, limit: int = 100) -> List[Product]:
         """Scrape men's shoes"""
         return self.scrape_category("/shoes", limit=limit, section='men')
     
-    def scrape_gucci_under_1000(self, limit: int = 20) -> List[Dict]:
+    def scrape_gucci_under_1000(self, limit: int = 20) -> List[Product]:
         """Scrape Gucci items under $1000"""
         return self.scrape_category(
             "/designers/gucci",
@@ -191,7 +376,7 @@ class MytheresaAPIScraper:
             section='men'
         )
     
-    def scrape_elie_saab(self, limit: int = 50) -> List[Dict]:
+    def scrape_elie_saab(self, limit: int = 50) -> List[Product]:
         """Scrape Elie Saab items"""
         return self.scrape_category(
             "/designers/elie-saab",
@@ -204,8 +389,6 @@ class MytheresaAPIScraper:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     
-    scraper = MytheresaAPIScraper()
-    
     print("="*70)
     print("Mytheresa API Scraper - Modular Professional Version")
     print("="*70)
@@ -213,13 +396,14 @@ if __name__ == "__main__":
     print("\nTesting with Saint Laurent products...")
     
     # Test with designer category
+    scraper = MytheresaAPIScraper()
     products = scraper.scrape_category("/designers/saint-laurent", limit=5)
     
     print(f"\n✓ Found {len(products)} products:")
     for i, p in enumerate(products, 1):
-        print(f"\n{i}. {p['brand']} - {p['name']}")
-        print(f"   Price: ${p['price']:.2f}" if p['price'] else "   Price: N/A")
-        print(f"   Color: {p['color']}")
+        print(f"\n{i}. {p.brand} - {p.name}")
+        print(f"   Price: ${p.price:.2f}" if p.price else "   Price: N/A")
+        print(f"   Color: {p.color}")
     
     print("\n" + "="*70)
     print("SUCCESS! Modular scraper working perfectly!")
@@ -0,0 +1,78 @@
+"""
+Token-bucket rate limiting and retry backoff for outgoing requests.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for coroutines, safe to share across event loops.
+    
+    Allows bursts of up to `burst` requests, refilled at `rate` tokens per
+    second. Each acquire reserves a token immediately and then waits until
+    it is due, so callers are served in order without busy-waiting.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        """
+        Initialize limiter.
+        
+        Args:
+            rate: Sustained requests per second
+            burst: Maximum requests allowed at once
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """
+        Take a token and return how long to wait before using it.
+        
+        Returns:
+            Delay in seconds (0 if a token was available)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+    
+    async def acquire_async(self):
+        """Wait (without blocking the event loop) until a request is allowed"""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None, cap: float = 60.0) -> float:
+    """
+    Delay before retrying a throttled or transiently failed request.
+    
+    Honors a numeric Retry-After header; otherwise uses exponential backoff
+    with jitter so concurrent clients do not retry in lockstep.
+    
+    Args:
+        attempt: Retry number (0 for the first retry)
+        retry_after: Retry-After header value, if any
+        cap: Maximum delay in seconds
+    
+    Returns:
+        Delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form; fall back to backoff
+    return min(cap, (2 ** attempt) + random.random())
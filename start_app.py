@@ -3,43 +3,73 @@ This file is  to run both FastAPI backend and Streamlit frontend
 
 """
 
+import socket
 import subprocess
 import sys
+import threading
 import time
 import webbrowser
 from pathlib import Path
-import os
 
-def check_dependencies():
-    """Check if required packages are installed"""
-    try:
-        import streamlit
-        import fastapi
-        import uvicorn
-        print("✅ All dependencies installed")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing dependency: {e}")
-        print("\nPlease install dependencies:")
-        print("pip install streamlit fastapi uvicorn")
-        return False
+import uvicorn
+
+def wait_port(host, port, timeout=20):
+    """
+    Wait until a TCP port accepts connections.
+    
+    Args:
+        host: Host to connect to
+        port: Port to connect to
+        timeout: Maximum seconds to wait
+    
+    Returns:
+        True if the port became reachable, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.25):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def wait_server(server, thread, timeout=20):
+    """
+    Wait until the in-process uvicorn server has finished starting up.
+    
+    Args:
+        server: uvicorn.Server from start_fastapi()
+        thread: Thread running the server
+        timeout: Maximum seconds to wait
+    
+    Returns:
+        True if the server is serving, False if it exited or timed out
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and thread.is_alive():
+        if server.started:
+            return True
+        time.sleep(0.1)
+    return False
 
 def start_fastapi():
-    """Start FastAPI backend"""
+    """
+    Start FastAPI backend inside this process.
+    
+    uvicorn is served from a background thread, so no extra interpreter is
+    launched for the backend. Runs without --reload; start uvicorn manually
+    for auto-reload during development.
+    
+    Returns:
+        Tuple of (uvicorn.Server, serving thread)
+    """
     print("\n🚀 Starting FastAPI backend...")
     
-    # Use CREATE_NEW_CONSOLE on Windows to open in new window
-    if sys.platform == "win32":
-        return subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "app.main:app", "--reload"],
-            creationflags=subprocess.CREATE_NEW_CONSOLE
-        )
-    else:
-        return subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "app.main:app", "--reload"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+    server = uvicorn.Server(uvicorn.Config("app.main:app", host="127.0.0.1", port=8000))
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    return server, thread
 
 def start_streamlit():
     """Start Streamlit frontend"""
@@ -65,10 +95,6 @@ def main():
     print("Fashion Image Analysis - Startup Script")
     print("="*70)
     
-    # Check dependencies
-    if not check_dependencies():
-        sys.exit(1)
-    
     # Check if frontend exists
     if not Path("frontend/app.py").exists():
         print("❌ Frontend not found at frontend/app.py")
@@ -77,21 +103,35 @@ def main():
     print("\n📋 Starting services...")
     print("   - FastAPI backend: http://127.0.0.1:8000")
     print("   - Streamlit frontend: http://localhost:8501")
-    print("\n⚠️  Two new console windows will open (don't close them!)")
+    print("\n⚠️  The backend runs in this window; keep it open")
     
+    # Start FastAPI
+    server, server_thread = start_fastapi()
+    streamlit_process = None
     try:
-        # Start FastAPI
-        fastapi_process = start_fastapi()
-        print("   ✅ FastAPI started in new window")
-        time.sleep(3)  # Wait for FastAPI to start
+        # uvicorn reports startup itself, so a port already taken by another
+        # process is not mistaken for our backend
+        if not wait_server(server, server_thread):
+            if not server_thread.is_alive():
+                raise RuntimeError("FastAPI backend exited during startup")
+            raise RuntimeError("FastAPI backend is not accepting connections")
+        print("   ✅ FastAPI started")
         
         # Start Streamlit
         streamlit_process = start_streamlit()
-        print("   ✅ Streamlit started in new window")
-        time.sleep(5)  # Wait for Streamlit to start
+        streamlit_ready = wait_port("127.0.0.1", 8501)
+        if streamlit_ready:
+            print("   ✅ Streamlit started in new window")
+        elif streamlit_process.poll() is not None:
+            raise RuntimeError("Streamlit frontend exited during startup")
+        else:
+            print("   ⚠️  Streamlit is not accepting connections yet")
         
         print("\n" + "="*70)
-        print("✅ Both services started successfully!")
+        if streamlit_ready:
+            print("✅ Both services started successfully!")
+        else:
+            print("⚠️  Backend started; Streamlit is still starting")
         print("="*70)
         print("\n🌐 Access the application:")
         print("   Frontend (Streamlit): http://localhost:8501")
@@ -100,32 +140,32 @@ def main():
         print("\n💡 Opening browser...")
         
         # Open browser
-        time.sleep(2)
         webbrowser.open("http://localhost:8501")
         
         print("\n✅ Browser opened!")
-        print("\n⚠️  To stop the services:")
-        print("   - Close the two console windows that opened")
-        print("   - Or press Ctrl+C in those windows")
-        print("\nThis window can be closed now.")
+        print("\n⚠️  Press Ctrl+C in this window to stop both services")
         
-        input("\nPress Enter to exit this window...")
+        # Serve until uvicorn exits on its own or the user interrupts
+        while server_thread.is_alive():
+            server_thread.join(0.5)
         
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping services...")
-        try:
-            fastapi_process.terminate()
-            streamlit_process.terminate()
-        except:
-            pass
+        server.should_exit = True
+        server_thread.join(10)
         print("✅ Services stopped")
     
     except Exception as e:
+        server.should_exit = True
         print(f"\n❌ Error: {e}")
         print("\nTry running manually:")
         print("  Terminal 1: python -m uvicorn app.main:app --reload")
         print("  Terminal 2: python -m streamlit run frontend/app.py")
         sys.exit(1)
+    
+    finally:
+        if streamlit_process is not None:
+            streamlit_process.terminate()
 
 if __name__ == "__main__":
     main()